@@ -1,4 +1,5 @@
 """Utility to support SNS topic publishing on failed CLI commands"""
+from functools import lru_cache
 
 import boto3
 import click
@@ -51,6 +52,13 @@ def catch_all_exceptions(cls, handler):  # noqa
     return Cls
 
 
+@lru_cache(maxsize=None)
+def _sns_client(profile_name=None, region_name=None):
+    """SNS client for the given profile and region, created once and reused on subsequent calls"""
+    session = boto3.Session(profile_name=profile_name, region_name=region_name)
+    return session.client('sns')
+
+
 def report_message_to_sns(subject, message, aws_sns_topic,
                           profile_name=None, region_name=None):
     """Push exceptions from click to SNS topic, used as handler for click applications
@@ -68,8 +76,7 @@ def report_message_to_sns(subject, message, aws_sns_topic,
     region_name : aws region (optional)
         AWS region
     """
-    session = boto3.Session(profile_name=profile_name, region_name=region_name)
-    sns_client = session.client('sns')
+    sns_client = _sns_client(profile_name, region_name)
     click.echo(message)
     sns_client.publish(TopicArn=aws_sns_topic,
                        Message=message,
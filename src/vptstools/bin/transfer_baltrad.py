@@ -1,13 +1,18 @@
 import datetime
+import logging
 import os
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import partial
-import tempfile
 
 import boto3
+from botocore.exceptions import ClientError
 import click
 from dotenv import load_dotenv
 import paramiko
 
+from vptstools.s3_config import TRANSFER_CONFIG, S3_CLIENT_CONFIG
 from vptstools.bin.click_exception import catch_all_exceptions, report_click_exception_to_sns
 
 # Load environmental variables from file in dev (load_dotenv doesn't override existing environment variables)
@@ -18,6 +23,21 @@ AWS_PROFILE = os.environ.get("AWS_PROFILE", None)
 AWS_REGION = os.environ.get("AWS_REGION", None)
 DESTINATION_BUCKET = os.environ.get("DESTINATION_BUCKET", "inbo-aloft-uat-eu-west-1-default")
 
+# SFTP read requests of 64KB instead of the paramiko default of 32KB and a larger SSH channel
+# window to keep more data in flight. Servers return short reads beyond their read limit
+# (256KB - 1024 for recent OpenSSH sftp-server releases, 64KB for older ones), which makes
+# paramiko abandon the prefetch and read the remainder synchronously, so the request size
+# must stay within the limit of any server version.
+SFTP_MAX_REQUEST_SIZE = 64 * 1024
+SSH_WINDOW_SIZE = 3 * 1024 * 1024
+
+# Default number of SFTP channels used for the downloads. All channels share a single SSH
+# connection, next to the listing channel, and OpenSSH allows 10 sessions per connection
+# by default (MaxSessions)
+SFTP_MAX_CHANNELS = 8
+
+VP_FILENAME_REGEX = re.compile(r"([^_]+)_vp_(\d{4})(\d{2})(\d{2})")
+
 # Update reporting to SNS functionality
 report_sns = partial(report_click_exception_to_sns,
                      aws_sns_topic=AWS_SNS_TOPIC,
@@ -43,8 +63,37 @@ def s3_key_exists(key: str, bucket: str, s3_client) -> bool:
     -------
     bool
     """
-    results = s3_client.list_objects(Bucket=bucket, Prefix=key)
-    return "Contents" in results
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as exc:
+        if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def list_existing_keys(prefix: str, bucket: str, s3_client) -> set:
+    """List all S3 keys in a bucket starting with a given prefix
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of the keys, e.g. the folder of a radar-day
+    bucket : str
+        Bucket name to search for keys
+    s3_client : boto3.Session
+        Boto3 session
+
+    Returns
+    -------
+    set of str
+    """
+    paginator = s3_client.get_paginator("list_objects_v2")
+    return {
+        obj["Key"]
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    }
 
 
 def extract_metadata_from_filename(filename: str) -> tuple:
@@ -58,24 +107,90 @@ def extract_metadata_from_filename(filename: str) -> tuple:
     filename : str
         Filename of a HDF5 incoming file from FTP
     """
-    elems = filename.split("_")
-    radar_code = elems[0]
-    timestamp = elems[2]
+    match = VP_FILENAME_REGEX.match(filename)
+    if not match:
+        raise ValueError(f"File name {filename} is not a valid VP file name.")
+    radar_code, year, month_str, day_str = match.groups()
+    return radar_code, year, month_str, day_str
 
-    year = timestamp[0:4]
-    month_str = timestamp[4:6]
-    day_str = timestamp[6:8]
 
-    return radar_code, year, month_str, day_str
+def destination_key_from_filename(filename: str) -> str:
+    """Define the S3 key of a VP file according to the folder path name convention
+
+    Parameters
+    ----------
+    filename : str
+        Filename of a HDF5 incoming file from FTP
+    """
+    radar_code, year, month_str, day_str = extract_metadata_from_filename(filename)
+    return f"baltrad/hdf5/{radar_code}/{year}/{month_str}/{day_str}/{filename}"
+
+
+def transfer_vp_file(filename: str, file_size: int, destination_key: str, destination_bucket: str,
+                     sftp_channels: queue.Queue, s3_client) -> None:
+    """Transfer a single VP file from the SFTP server to the S3 bucket
+
+    Parameters
+    ----------
+    filename : str
+        Name of the VP file in the SFTP data directory
+    file_size : int
+        Size of the VP file as listed on the SFTP server
+    destination_key : str
+        Key of the object in the S3 bucket
+    destination_bucket : str
+        Bucket name to upload the file to
+    sftp_channels : queue.Queue
+        Queue of open ``paramiko.SFTPClient`` channels. As a single SFTP channel is not thread-safe,
+        a channel is taken from the queue for the duration of the download and put back afterwards.
+    s3_client : boto3.Session
+        Boto3 session
+    """
+    click.echo(f"{destination_key} does not exist at {destination_bucket}, transfer it...")
+    sftp = sftp_channels.get()
+    try:
+        # stream the remote file to S3 without intermediate local file, so download and upload overlap
+        with sftp.open(filename, "rb") as sftp_file:
+            sftp_file.MAX_REQUEST_SIZE = SFTP_MAX_REQUEST_SIZE
+            sftp_file.prefetch(file_size)  # size known from listing, avoids an additional stat request
+            s3_client.upload_fileobj(
+                sftp_file,
+                destination_bucket,
+                destination_key,
+                Config=TRANSFER_CONFIG,
+            )
+        click.echo(f"Transfer of file {filename} to S3 completed!")
+    except FileNotFoundError:
+        click.echo(f"{filename} file could not longer be found on sFTP, skipping file.")
+    finally:
+        sftp_channels.put(sftp)
 
 
 @click.command(cls=catch_all_exceptions(click.Command, handler=report_sns))  # Add SNS-reporting to exception
-def cli():
+@click.option(
+    "--max-workers",
+    "max_workers",
+    default=None,
+    type=int,
+    help="Number of files transferred concurrently, bounded by --max-channels as each "
+    "transfer holds an SFTP channel. Defaults to --max-channels.",
+)
+@click.option(
+    "--max-channels",
+    "max_channels",
+    default=SFTP_MAX_CHANNELS,
+    type=int,
+    help="Maximum number of SFTP channels opened for the downloads.",
+)
+def cli(max_workers, max_channels):
     """Sync files from Baltrad FTP server to the Aloft S3 bucket.
 
     This function connects via SFTP to the BALTRAD server, downloads the available VP files (PVOL gets ignored),
     from the FTP server and upload the HDF5 file to the Aloft S3 bucket according to the defined folder path name
-    convention. Existing files are ignored.
+    convention. Existing files are ignored. Files are transferred concurrently by ``--max-workers`` threads.
+    As each transfer holds an SFTP channel for both the download and the upload, the concurrency is bounded by
+    the number of SFTP channels (``--max-channels``, also the default number of workers). When the server
+    refuses to open an additional channel, the transfer continues with the channels already open.
 
     Designed to be executed via a simple scheduled job like cron or scheduled cloud function. Remark that
     files disappear after a few days on the BALTRAD server.
@@ -91,6 +206,7 @@ def cli():
     - ``SNS_TOPIC``: AWS SNS topic to report when routine fails
     - ``AWS_REGION``: AWS region where the SNS alerting is defined
     - ``AWS_PROFILE``: AWS profile (mainly useful for local development when working with multiple AWS profiles)
+    - ``PARAMIKO_DEBUG``: If set, write the paramiko debug log to ``paramiko.log`` (mainly useful for debugging)
     """
     cli_start_time = datetime.datetime.now()
     click.echo(f"Start transfer Baltrad FTP sync at {cli_start_time}")
@@ -101,9 +217,14 @@ def cli():
     baltrad_server_password = os.environ.get("FTP_PWD")
     baltrad_server_datadir = os.environ.get("FTP_DATADIR", "data")
     destination_bucket = DESTINATION_BUCKET
+    if max_workers is None:  # more workers than channels would wait for a free channel
+        max_workers = max_channels
 
     click.echo("Establish SFTP connection.")
-    paramiko.util.log_to_file("paramiko.log")
+    # paramiko packet-level logging slows down the transfer, only log to file when explicitly requested
+    logging.getLogger("paramiko").setLevel(logging.WARNING)
+    if os.environ.get("PARAMIKO_DEBUG"):
+        paramiko.util.log_to_file("paramiko.log")
     with paramiko.SSHClient() as ssh:
         ssh.set_missing_host_key_policy(
             paramiko.AutoAddPolicy()
@@ -114,53 +235,70 @@ def cli():
             username=baltrad_server_username,
             password=baltrad_server_password,
         )
+        ssh.get_transport().default_window_size = SSH_WINDOW_SIZE  # applies to the SFTP channels opened next
         with ssh.open_sftp() as sftp:
             sftp.chdir(baltrad_server_datadir)
 
             click.echo("Initialize S3/Boto3 client")
             session = boto3.Session(profile_name=AWS_PROFILE)
-            s3_client = session.client("s3")
+            s3_client = session.client("s3", config=S3_CLIENT_CONFIG)
             click.echo("Initialization complete, we can loop on files on the SFTP server")
 
-            # listdir_attr is not a generator like listdir_iter which introduced BUG, but as the time between enlisting
-            # and the effective download is now larger, the risk of a removed file in between requires us to
-            # double check on the existence (should be edge case when running daily).
-            for entry in sftp.listdir_attr():
-                if "_vp_" in entry.filename:  # PVOLs and other files are ignored
-                    click.echo(
-                        f"{entry.filename} is a VP file, we need to consider it... "
-                    )
-
-                    radar_code, year, month_str, day_str = extract_metadata_from_filename(
-                        entry.filename
-                    )
-                    destination_key = (
-                        f"baltrad/hdf5/{radar_code}/{year}/"
-                        f"{month_str}/{day_str}/{entry.filename}"
-                    )
-                    if not s3_key_exists(destination_key, destination_bucket, s3_client):
-                        click.echo(
-                            f"{destination_key} does not exist at {destination_bucket}, "
-                            f"transfer it..."
-                        )
-                        with tempfile.TemporaryDirectory() as tmpdirname:
-                            tmp_file_path = os.path.join(tmpdirname, entry.filename)
+            # listdir_iter streams the directory entries, so transfers start while the listing continues. The
+            # main channel is only used for the listing, as interleaving downloads with listdir_iter on the same
+            # channel introduced BUG. Files can still be removed between listing and download, which is handled
+            # in the transfer itself (should be edge case when running daily).
+            existing_keys = dict()  # existing keys listed once for each radar-day folder, on its first file
+            sftp_channels = queue.Queue()  # paramiko SFTP channels are not thread-safe, shared via a queue
+            worker_channels = []
+            max_channels = min(max_channels, max_workers)
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = []
+                    for entry in sftp.listdir_iter():
+                        if "_vp_" not in entry.filename:  # PVOLs and other files are ignored
+                            continue
+                        try:
+                            destination_key = destination_key_from_filename(entry.filename)
+                        except ValueError:
+                            click.echo(f"{entry.filename} is not a valid VP file name, skip it.")
+                            continue
+                        prefix = destination_key.rsplit("/", 1)[0] + "/"
+                        if prefix not in existing_keys:
+                            existing_keys[prefix] = list_existing_keys(prefix, destination_bucket, s3_client)
+                        if destination_key in existing_keys[prefix]:
+                            click.echo(f"{destination_key} already exists at {destination_bucket}, skip it.")
+                            continue
+
+                        if len(worker_channels) < max_channels:
                             try:
-                                sftp.get(entry.filename, tmp_file_path)
-                                click.echo(f"SFTP download of file {entry.filename} completed.")
-                                s3_client.upload_file(
-                                    tmp_file_path, destination_bucket, destination_key
-                                )
-                                click.echo(f"Upload of file {entry.filename} to S3 completed!")
-                            except FileNotFoundError:
-                                click.echo(
-                                    f"{entry.filename} file could not longer be found on sFTP, skipping file."
-                                )
-
-                    else:
-                        click.echo(
-                            f"{destination_key} already exists at {destination_bucket}, skip it."
+                                channel = ssh.open_sftp()
+                            except paramiko.SSHException as exc:
+                                if not worker_channels:
+                                    raise
+                                click.echo(f"Could not open an additional SFTP channel ({exc}), continue "
+                                           f"with {len(worker_channels)} channels.")
+                                max_channels = len(worker_channels)
+                            else:
+                                channel.chdir(baltrad_server_datadir)
+                                worker_channels.append(channel)
+                                sftp_channels.put(channel)
+                        futures.append(
+                            executor.submit(
+                                transfer_vp_file,
+                                entry.filename,
+                                entry.st_size,
+                                destination_key,
+                                destination_bucket,
+                                sftp_channels,
+                                s3_client,
+                            )
                         )
+                    for future in as_completed(futures):
+                        future.result()  # surface exceptions of the individual transfers
+            finally:
+                for channel in worker_channels:
+                    channel.close()
     cli_duration = datetime.datetime.now() - cli_start_time
     click.echo(f"File transfer from Baltrad finished, the syncrhonization took {cli_duration}.")
 
@@ -1,5 +1,9 @@
+import gzip
+import io
+import multiprocessing
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 from functools import partial
 import shutil
@@ -7,13 +11,16 @@ from pathlib import Path
 from datetime import date
 
 import boto3
+from boto3.s3.transfer import create_transfer_manager
 import click
 from dotenv import load_dotenv
 import s3fs
 import pandas as pd
 
 from vptstools.vpts import vpts, vpts_to_csv
-from vptstools.s3 import handle_manifest, OdimFilePath, extract_daily_group_from_path
+from vptstools.s3 import (handle_manifest, OdimFilePath, extract_daily_group_from_path,
+                          S3FS_CONFIG_KWARGS)
+from vptstools.s3_config import TRANSFER_CONFIG, S3_CLIENT_CONFIG
 from vptstools.bin.click_exception import catch_all_exceptions, report_click_exception_to_sns
 
 # Load environmental variables from file in dev
@@ -40,6 +47,125 @@ sns_report_exception = partial(report_click_exception_to_sns,
                                )
 
 
+def create_daily_vpts(daily_vpts, s3_client, inbo_s3, pool=None):
+    """Create the daily VPTS file of a single radar-day and upload it to the S3 bucket
+
+    Errors are reported as a warning, so the other radar-days are still processed.
+
+    Parameters
+    ----------
+    daily_vpts : tuple
+        Directory info of the radar-day, i.e. (source, file_type, radar_code, year, month, day)
+    s3_client : boto3 S3 client
+        Boto3 S3 client
+    inbo_s3 : s3fs.S3FileSystem
+        S3 file system to list the files in the bucket
+    pool : multiprocessing.pool.Pool, optional
+        Process pool shared by the radar-days to convert the HDF5 files with
+    """
+    source, _, radar_code, year, month, day = daily_vpts
+    try:
+        # Enlist files of the day to rerun (all the given day)
+        odim_path = OdimFilePath(source, radar_code, "vp", year, month, day)
+        odim5_files = inbo_s3.ls(f"{S3_BUCKET}/{odim_path.s3_folder_path_h5}")
+        click.echo(f"Create daily VPTS file {odim_path.s3_file_path_daily_vpts}.")
+        # - create tempdir
+        temp_folder_path = Path(tempfile.mkdtemp())
+
+        with create_transfer_manager(s3_client, TRANSFER_CONFIG) as transfer_manager:
+            # - download the files of the day concurrently
+            # (s3fs fails in wrapped moto environment; use boto3 transfer manager)
+            h5_file_local_paths = []
+            downloads = []
+            for file_key in odim5_files:
+                h5_path = OdimFilePath.from_s3fs_enlisting(file_key)
+                h5_local_path = str(temp_folder_path / h5_path.file_name)
+                downloads.append(
+                    transfer_manager.download(
+                        S3_BUCKET,
+                        f"{h5_path.s3_folder_path_h5}/{h5_path.file_name}",
+                        h5_local_path,
+                    )
+                )
+                h5_file_local_paths.append(h5_local_path)
+            for download in downloads:
+                download.result()
+
+            # - run VPTS on all locally downloaded files
+            df_vpts = vpts(h5_file_local_paths, pool=pool)
+
+            # - write VPTS data in memory and upload to S3 (no intermediate local file)
+            daily_vpts_file = io.BytesIO()
+            vpts_to_csv(df_vpts, daily_vpts_file)
+            daily_vpts_file.seek(0)
+            transfer_manager.upload(
+                daily_vpts_file,
+                S3_BUCKET,
+                odim_path.s3_file_path_daily_vpts,
+            ).result()
+
+        # - remove tempdir with local files
+        shutil.rmtree(temp_folder_path)
+    except Exception as exc:
+        click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
+                   f"{year}-{month}-{day} to daily VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+
+
+def create_monthly_vpts(monthly_vpts, s3_client, inbo_s3):
+    """Create the monthly VPTS file of a single radar-month from the daily VPTS files
+
+    Errors are reported as a warning, so the other radar-months are still processed.
+
+    Parameters
+    ----------
+    monthly_vpts : tuple
+        Directory info of the radar-month, i.e. (source, file_type, radar_code, year, month)
+    s3_client : boto3 S3 client
+        Boto3 S3 client
+    inbo_s3 : s3fs.S3FileSystem
+        S3 file system to read the daily files in the bucket
+    """
+    source, _, radar_code, year, month = monthly_vpts
+    try:
+        odim_path = OdimFilePath(source, radar_code, "vp", year, month, "01")
+
+        click.echo(f"Create monthly VPTS file {odim_path.s3_file_path_monthly_vpts}.")
+        # only list the daily files of the month itself (server-side prefix filter)
+        month_prefix = (f"{odim_path.s3_path_setup('daily')}/"
+                        f"{odim_path.radar_code}_vpts_{odim_path.year}{odim_path.month}")
+        paginator = s3_client.get_paginator("list_objects_v2")
+        files_to_concat = sorted(
+            f"{S3_BUCKET}/{obj['Key']}"
+            for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=month_prefix)
+            for obj in page.get("Contents", [])
+        )
+        if not files_to_concat:
+            raise ValueError("No daily VPTS files available to concatenate")
+        # all daily files share the same header: concatenate the raw bytes of the
+        # daily files (read concurrently) without parsing, only keeping the header
+        # of the first file
+        monthly_vpts_file = io.BytesIO()
+        max_concurrency = TRANSFER_CONFIG.max_request_concurrency
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            daily_vpts_files = executor.map(inbo_s3.cat_file, files_to_concat)
+            with gzip.GzipFile(fileobj=monthly_vpts_file, mode="wb") as gzip_file:
+                for j, daily_vpts_data in enumerate(daily_vpts_files):
+                    if j > 0:
+                        daily_vpts_data = daily_vpts_data.split(b"\n", 1)[-1]
+                    gzip_file.write(daily_vpts_data)
+        # upload from memory (no intermediate local file), as multipart
+        monthly_vpts_file.seek(0)
+        s3_client.upload_fileobj(
+            monthly_vpts_file,
+            S3_BUCKET,
+            odim_path.s3_file_path_monthly_vpts,
+            Config=TRANSFER_CONFIG,
+        )
+    except Exception as exc:
+        click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
+                   f"{year}-{month} to monthly VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+
+
 @click.command(cls=catch_all_exceptions(click.Command, handler=sns_report_exception))  # Add SNS-reporting on exception
 @click.option(
     "--modified-days-ago",
@@ -56,7 +182,14 @@ sns_report_exception = partial(report_click_exception_to_sns,
     help="Apply the conversion to VPTS to all files within a S3 sub-folders instead "
          "of using the modified date of the files. This option does not use the inventory files."
 )
-def cli(modified_days_ago, path_s3_folder=None):
+@click.option(
+    "--max-workers",
+    "max_workers",
+    default=4,
+    type=int,
+    help="Number of radar-days (and radar-months) processed concurrently.",
+)
+def cli(modified_days_ago, path_s3_folder=None, max_workers=4):
     """Convert and aggregate HDF5 VP files to daily and monthly VPTS CSV files on S3 bucket
 
     Check the latest modified
@@ -87,11 +220,12 @@ def cli(modified_days_ago, path_s3_folder=None):
     - ``AWS_PROFILE``: AWS profile (mainly useful for local development when
       working with multiple AWS profiles)
     """
+    # share the connection pool size and retry settings of the boto3 client with s3fs
+    storage_options = {"config_kwargs": S3FS_CONFIG_KWARGS}
     if AWS_PROFILE:
-        storage_options = {"profile": AWS_PROFILE}
+        storage_options["profile"] = AWS_PROFILE
         boto3_options = {"profile_name": AWS_PROFILE}
     else:
-        storage_options = dict()
         boto3_options = dict()
 
     if path_s3_folder:
@@ -102,10 +236,10 @@ def cli(modified_days_ago, path_s3_folder=None):
         odim5_files = chain(inbo_s3.glob(f"{S3_BUCKET}/{path_s3_folder}/**/*.h5"),
                             inbo_s3.glob(f"{S3_BUCKET}/{path_s3_folder}/*.h5"))
 
+        df_odim5_files = pd.DataFrame(odim5_files, columns=["file"])
         days_to_create_vpts = (
-            pd.DataFrame(odim5_files, columns=["file"])
-            .set_index("file")
-            .groupby(extract_daily_group_from_path).size().reset_index()
+            df_odim5_files
+            .groupby(df_odim5_files["file"].map(extract_daily_group_from_path).rename(None)).size().reset_index()
             .rename(
                 columns={
                     "index": "directory",
@@ -145,7 +279,7 @@ def cli(modified_days_ago, path_s3_folder=None):
 
         # Save coverage file to S3 bucket
         click.echo("Save coverage file to S3.")
-        df_cov["directory"] = df_cov["directory"].str.join("/")
+        df_cov["directory"] = ["/".join(directory) for directory in df_cov["directory"].to_numpy()]
         df_cov.to_csv(
             f"s3://{S3_BUCKET}/coverage.csv", index=False, storage_options=storage_options
         )
@@ -154,98 +288,36 @@ def cli(modified_days_ago, path_s3_folder=None):
     inbo_s3 = s3fs.S3FileSystem(**storage_options)
     # PATCH TO OVERCOME RECURSIVE s3fs in wrapped context
     session = boto3.Session(**boto3_options)
-    s3_client = session.client("s3")
+    s3_client = session.client("s3", config=S3_CLIENT_CONFIG)
 
     click.echo(f"Create {days_to_create_vpts.shape[0]} daily VPTS files.")
-    for j, daily_vpts in enumerate(days_to_create_vpts["directory"]):
-        try:
-            # Enlist files of the day to rerun (all the given day)
-            source, _, radar_code, year, month, day = daily_vpts
-            odim_path = OdimFilePath(source, radar_code, "vp", year, month, day)
-            odim5_files = inbo_s3.ls(f"{S3_BUCKET}/{odim_path.s3_folder_path_h5}")
-            click.echo(f"Create daily VPTS file {odim_path.s3_file_path_daily_vpts}.")
-            # - create tempdir
-            temp_folder_path = Path(tempfile.mkdtemp())
-
-            # - download the files of the day
-            h5_file_local_paths = []
-            for i, file_key in enumerate(odim5_files):
-                h5_path = OdimFilePath.from_s3fs_enlisting(file_key)
-                h5_local_path = str(temp_folder_path / h5_path.file_name)
-                # inbo_s3.get_file(file_key, h5_local_path)
-                # s3f3 fails in wrapped moto environment; fall back to boto3
-                s3_client.download_file(
-                    S3_BUCKET,
-                    f"{h5_path.s3_folder_path_h5}/{h5_path.file_name}",
-                    h5_local_path,
-                )
-                h5_file_local_paths.append(h5_local_path)
-
-            # - run VPTS on all locally downloaded files
-            df_vpts = vpts(h5_file_local_paths)
-
-            # - save VPTS file locally
-            vpts_to_csv(df_vpts, temp_folder_path / odim_path.daily_vpts_file_name)
-
-            # - copy VPTS file to S3
-            inbo_s3.put(
-                str(temp_folder_path / odim_path.daily_vpts_file_name),
-                f"{S3_BUCKET}/{odim_path.s3_file_path_daily_vpts}",
-            )
-
-            # - remove tempdir with local files
-            shutil.rmtree(temp_folder_path)
-        except Exception as exc:
-            click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
-                       f"{year}-{month}-{day} to daily VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+    # a single process pool for the conversion, created before the radar-day threads
+    # are started (forking from a process running other threads can deadlock) and
+    # shared by the radar-days, so downloads and uploads run concurrently without
+    # oversubscribing the CPUs
+    cpu_count = max(multiprocessing.cpu_count() - 1, 1)
+    with multiprocessing.Pool(processes=cpu_count) as pool:
+        create_daily = partial(
+            create_daily_vpts, s3_client=s3_client, inbo_s3=inbo_s3, pool=pool
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(create_daily, days_to_create_vpts["directory"]))
 
     click.echo("Finished creating daily VPTS files.")
 
     # Run VPTS monthly conversion for each radar-day with modified files
-    # TODO - abstract monthly procedure to separate functionality
     months_to_create_vpts = days_to_create_vpts
-    months_to_create_vpts["directory"] = months_to_create_vpts["directory"].apply(
-        lambda x: x[:-1]
-    )  # remove day
+    months_to_create_vpts["directory"] = [
+        directory[:-1] for directory in months_to_create_vpts["directory"].to_numpy()
+    ]  # remove day
     months_to_create_vpts = (
         months_to_create_vpts.groupby("directory").size().reset_index()
     )
 
     click.echo(f"Create {months_to_create_vpts.shape[0]} monthly VPTS files.")
-    for j, monthly_vpts in enumerate(months_to_create_vpts["directory"]):
-        try:
-            source, _, radar_code, year, month = monthly_vpts
-            odim_path = OdimFilePath(source, radar_code, "vp", year, month, "01")
-
-            click.echo(f"Create monthly VPTS file {odim_path.s3_file_path_monthly_vpts}.")
-            file_list = inbo_s3.ls(f"{S3_BUCKET}/{odim_path.s3_path_setup('daily')}")
-            files_to_concat = sorted(
-                [
-                    daily_vpts
-                    for daily_vpts in file_list
-                    if daily_vpts.find(f"{odim_path.year}{odim_path.month}") >= 0
-                ]
-            )
-            # do not parse Nan values, but keep all data as string
-            df_month = pd.concat(
-                [
-                    pd.read_csv(
-                        f"s3://{file_path}",
-                        dtype=str,
-                        keep_default_na=False,
-                        na_values=None,
-                    )
-                    for file_path in files_to_concat
-                ]
-            )
-            df_month.to_csv(
-                f"s3://{S3_BUCKET}/{odim_path.s3_file_path_monthly_vpts}",
-                index=False,
-                storage_options=storage_options,
-            )
-        except Exception as exc:
-            click.echo(f"[WARNING] - During conversion from HDF5 files of {source}/{radar_code} at "
-                       f"{year}-{month}-{day} to monthly VPTS file, the following error occurred: {type(exc).__name__} - {exc}.")
+    create_monthly = partial(create_monthly_vpts, s3_client=s3_client, inbo_s3=inbo_s3)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(create_monthly, months_to_create_vpts["directory"]))
 
     click.echo("Finished creating monthly VPTS files.")
     click.echo("Finished VPTS update procedure.")
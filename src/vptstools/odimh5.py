@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict, List
+from functools import cached_property
+from pathlib import Path
+from typing import IO, Dict, List
 
 import h5py  # type: ignore
 import pytz
@@ -17,29 +19,40 @@ class ODIMReader(object):
     """Read ODIM (HDF5) files with context manager
 
     Should be used with the "with" statement  (context manager) to
-    properly close the HDF5 file.
+    properly close the HDF5 file. The root attributes are read and
+    decoded once and cached on the instance.
 
     Attributes
     ----------
     hdf5 : HDF5 file object
+    file_name : str | None
+        Name of the ODIM file (without parent folders), None when reading from
+        a file-like object without a (path) name, e.g. ``io.BytesIO``
     """
 
     def __enter__(self) -> ODIMReader:
         return self
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str | IO[bytes]):
         """Open an ODIM file
 
         Parameters
         ----------
-        file_path : Path | str
-            HDF5 ODIM File path
+        file_path : Path | str | file-like object
+            HDF5 ODIM File path or a binary file-like object (e.g. an opened
+            ``s3fs``/``fsspec`` file or ``io.BytesIO``) to read the data from
+            without intermediate local file
 
         Raises
         ------
         OSError: Unable to open file
         """
         self.hdf5 = h5py.File(file_path, mode="r")
+        if hasattr(file_path, "read"):
+            name = getattr(file_path, "name", None)
+            self.file_name = Path(name).name if isinstance(name, str) else None
+        else:
+            self.file_name = Path(file_path).name
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
@@ -60,39 +73,39 @@ class ODIMReader(object):
         keys = list(self.hdf5)
         return [key for key in keys if "dataset" in key]
 
-    @property
+    @cached_property
     def how(self) -> dict:
         """Get the 'how' as dictionary"""
         return self._extract_root_attributes_dict("how")
 
-    @property
+    @cached_property
     def where(self) -> dict:
         """Get the 'where' as dictionary"""
         return self._extract_root_attributes_dict("where")
 
-    @property
+    @cached_property
     def what(self) -> dict:
         """Get the 'what' as dictionary"""
         return self._extract_root_attributes_dict("what")
 
-    @property
+    @cached_property
     def root_date_str(self) -> str:
         """Get the root what.date attribute as a string, format 'YYYYMMDD'"""
         return self._extract_root_attribute_str("what", "date")
 
-    @property
+    @cached_property
     def root_time_str(self) -> str:
         """Get the root what.time attribute as a string, format 'HHMMSS' (UTC)"""
         return self._extract_root_attribute_str("what", "time")
 
-    @property
+    @cached_property
     def root_datetime(self) -> datetime:
         """Get the root date and time as a proper aware datetime object"""
         return datetime.strptime(
             f"{self.root_date_str}{self.root_time_str}", "%Y%m%d%H%M%S"
         ).replace(tzinfo=pytz.UTC)
 
-    @property
+    @cached_property
     def root_source_str(self) -> str:
         """Get the root what.source attribute as a string.
 
@@ -100,22 +113,15 @@ class ODIMReader(object):
         """
         return self._extract_root_attribute_str("what", "source")
 
-    @property
+    @cached_property
     def root_source(self) -> Dict[str, str]:
         """Get the root what.source attribute as a dict.
 
         Example: {'WMO':'06477', 'NOD':'bewid', 'RAD':'BX41', 'PLC':'Wideumont'}
         """
-        string = self.root_source_str
-        kv_pairs = string.split(",")
-        r = {}
-        for kv_pair in kv_pairs:
-            k, v = kv_pair.split(":")
-            r[k] = v
+        return dict(kv_pair.split(":", 1) for kv_pair in self.root_source_str.split(","))
 
-        return r
-
-    @property
+    @cached_property
     def root_object_str(self) -> str:
         """Get the root what.object attribute as a string.
 
@@ -1,11 +1,41 @@
 import re
 import urllib
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
 from pathlib import Path
 from dataclasses import dataclass
 
 import s3fs
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Equivalent settings for the (aiobotocore) client of the s3fs.S3FileSystem, to be
+# passed as ``config_kwargs`` in the s3fs storage options
+S3FS_CONFIG_KWARGS = {
+    "max_pool_connections": 64,
+    "retries": {"mode": "standard", "max_attempts": 10},
+}
+
+# Number of inventory files (as listed in the manifest) read concurrently and the size
+# of the blocks in which each inventory file is parsed (some 60.000 files per block)
+INVENTORY_MAX_WORKERS = 8
+INVENTORY_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+# ODIM HDF5 file name convention, see OdimFilePath.parse_file_name
+ODIM_FILE_NAME_REGEX = re.compile(
+    r".*([a-zA-Z]{5})_([a-z]*)_(\d\d\d\d)(\d\d)(\d\d)T?(\d\d)(\d\d).*\.h5"
+)
+# S3 inventory file path, i.e. source/file_type/.../file name,
+# see OdimFilePath.from_inventory
+INVENTORY_FILE_REGEX = re.compile(r"([^/]*)/([^/]*)/" + ODIM_FILE_NAME_REGEX.pattern)
+# s3fs enlisted file path, i.e. bucket/source/file_type/.../file name,
+# see OdimFilePath.from_s3fs_enlisting
+S3FS_FILE_REGEX = re.compile(r"[^/]*/" + INVENTORY_FILE_REGEX.pattern)
 
 
 @dataclass(frozen=True)
@@ -34,6 +64,11 @@ class OdimFilePath:
         File name from which the other properties were derived
     file_type: str = "", optional
         File type from which the other properties were derived, e.g. hdf5
+
+    Notes
+    -----
+    As instances are immutable, the derived file names and S3 keys are
+    only formatted once and cached on the instance.
     """
 
     source: str
@@ -97,10 +132,7 @@ class OdimFilePath:
         ``T`` is optional, ``extra`` is ignored.
         """
 
-        name_regex = re.compile(
-            r".*([a-zA-Z]{5})_([a-z]*)_(\d\d\d\d)(\d\d)(\d\d)T?(\d\d)(\d\d).*\.h5"
-        )
-        match = re.match(name_regex, file_name)
+        match = ODIM_FILE_NAME_REGEX.match(file_name)
         if match:
             file_name = Path(file_name).name
             radar_code, data_type, year, month, day, hour, minute = match.groups()
@@ -118,7 +150,7 @@ class OdimFilePath:
         """Radar code"""
         return self.radar_code[2:]
 
-    @property
+    @cached_property
     def daily_vpts_file_name(self):
         """Name of the corresponding daily VPTS file"""
         return f"{self.radar_code}_vpts_{self.year}{self.month}{self.day}.csv"
@@ -134,17 +166,17 @@ class OdimFilePath:
             f"{self.month}/{self.day}/{self.file_name}"
         )
 
-    @property
+    @cached_property
     def s3_folder_path_h5(self):
         """S3 key with the folder containing the HDF5 file"""
         return f"{self.s3_path_setup('hdf5')}/{self.month}/{self.day}"
 
-    @property
+    @cached_property
     def s3_file_path_daily_vpts(self):
         """S3 key of the daily VPTS file corresponding to the HDF5 file"""
         return f"{self.s3_path_setup('daily')}/{self.daily_vpts_file_name}"
 
-    @property
+    @cached_property
     def s3_file_path_monthly_vpts(self):
         """S3 key of the monthly concatenated VPTS file corresponding to the HDF5 file"""
         return (
@@ -174,6 +206,17 @@ def list_manifest_file_keys(s3_manifest_url, storage_options=None):
             yield obj
 
 
+def _daily_group_from_match(match, file_path):
+    """Translate a match of the inventory/s3fs file path regex into a daily group tuple
+
+    The group is created directly from the regex match, without an intermediate
+    ``OdimFilePath``, as this is called for each file of the S3 inventory.
+    """
+    if not match:
+        raise ValueError(f"File name {file_path} is not a valid ODIM HDF5 file.")
+    return match[1], match[2], match[3].lower(), match[5], match[6], match[7]
+
+
 def extract_daily_group_from_inventory(file_path):
     """Extract file name components to define a group
 
@@ -189,15 +232,8 @@ def extract_daily_group_from_inventory(file_path):
         File path of the ODIM HDF5 file. Only the file name is taken
         into account and a folder-path is ignored.
     """
-    path_info = OdimFilePath.from_inventory(file_path)
-    return (
-        path_info.source,
-        path_info.file_type,
-        path_info.radar_code,
-        path_info.year,
-        path_info.month,
-        path_info.day,
-    )
+    return _daily_group_from_match(INVENTORY_FILE_REGEX.match(file_path), file_path)
+
 
 def extract_daily_group_from_path(file_path):
     """Extract file name components to define a group
@@ -214,15 +250,7 @@ def extract_daily_group_from_path(file_path):
         File path of the ODIM HDF5 file. Only the file name is taken
         into account and a folder-path is ignored.
     """
-    path_info = OdimFilePath.from_s3fs_enlisting(file_path)
-    return (
-        path_info.source,
-        path_info.file_type,
-        path_info.radar_code,
-        path_info.year,
-        path_info.month,
-        path_info.day,
-    )
+    return _daily_group_from_match(S3FS_FILE_REGEX.match(file_path), file_path)
 
 
 def _last_modified_from_inventory(df, modified_days_ago="2day"):
@@ -240,40 +268,73 @@ def _last_modified_from_inventory(df, modified_days_ago="2day"):
     ]
 
 
-def _radar_day_counts_from_inventory(
-    df, group_callable=extract_daily_group_from_inventory
-):
+def _daily_groups_from_inventory(file_paths):
+    """Extract the daily group components of a Series of inventory file paths at once
+
+    Equivalent of applying :func:`extract_daily_group_from_inventory` to each file
+    path, but parsing all paths in a single pass with a precompiled regular expression
+    so the counts can be grouped on columns instead of a per-row callable.
+
+    Parameters
+    ----------
+    file_paths : pandas.Series
+        File paths of ODIM HDF5 files as listed in the S3 inventory
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with the columns source, file_type, radar_code, year, month and day
+    """
+    return pd.DataFrame(
+        [
+            _daily_group_from_match(INVENTORY_FILE_REGEX.match(file_path), file_path)
+            for file_path in file_paths.to_numpy()
+        ],
+        columns=["source", "file_type", "radar_code", "year", "month", "day"],
+        dtype=object,
+    )
+
+
+def _radar_day_counts_from_inventory(df, group_callable=None):
     """Count files according to groups as defined by callable
 
     Parameters
     ----------
     df : pandas.DataFrame
         DataFrame need to contain a 'file' column used to count and is passed to callable
-    group_callable : callable
-        Function to translate the file name into individual groups
+    group_callable : callable, optional
+        Function to translate the file name into individual groups. When None, the
+        daily groups (source, file_type, radar_code, year, month, day) are extracted
+        for all files at once, see :func:`extract_daily_group_from_inventory`.
 
     Returns
     -------
     df : pandas DataFrame
         DataFrame containing the counts per group
     """
-    return df.set_index("file").groupby(group_callable).size()
+    if group_callable is not None:
+        # precompute the group of each file to group on a column instead of the callable
+        return df.groupby(df["file"].map(group_callable).rename(None)).size()
+    groups = _daily_groups_from_inventory(df["file"])
+    counts = groups.groupby(list(groups.columns)).size()
+    # group as tuple, e.g. (source, ..., day)
+    counts.index = counts.index.to_flat_index()
+    return counts
 
 
-def _handle_inventory(
-    df, modified_days_ago, group_func=extract_daily_group_from_inventory
-):
+def _handle_inventory(df, modified_days_ago, group_func=None):
     """Extract modified days and coverage from a single inventory df
 
     Parameters
     ----------
     df : pandas.DataFrame
-        Pandas DataFrame of a parsed inventory file with the columns
-        "repo" (str), "file" (str), "size" (int) and "modified" (datetime)
+        Pandas DataFrame of a parsed inventory file with (at least) the columns
+        "file" (str) and "modified" (datetime)
     modified_days_ago : str
         pandas Timedelta description, e.g. 2days
-    group_func : callable
-        Function used to create countable groups
+    group_func : callable, optional
+        Function used to create countable groups, by default the daily groups
+        of :func:`extract_daily_group_from_inventory` (extracted vectorized)
 
     Returns
     -------
@@ -287,14 +348,11 @@ def _handle_inventory(
 
     """
     # Filter for HDF5 files and extract source
+    df = df[df["file"].str.endswith(".h5")].copy()
     df["modified"] = pd.to_datetime(
         df["modified"], format="%Y-%m-%dT%H:%M:%S.%fZ", utc=True
     )
-    df["file_items"] = df["file"].str.split("/")
-    df["suffix"] = df["file_items"].str.get(-1).str.split(".").str.get(-1)
-    df["source"] = df["file_items"].str.get(0)
-    df = df[df["suffix"] == "h5"]
-    df = df.drop(columns=["file_items", "suffix"])
+    df["source"] = df["file"].str.split("/", n=1).str[0]
 
     # Extract IDs latest N days modified files
     df_last_n_days = _last_modified_from_inventory(df, modified_days_ago)
@@ -303,6 +361,65 @@ def _handle_inventory(
     return df_coverage, df_last_n_days
 
 
+def _handle_inventory_file(inventory_url, modified_days_ago, storage_options=None):
+    """Extract modified days and coverage from a single inventory file, read in blocks
+
+    Parameters
+    ----------
+    inventory_url : str
+        URL of the S3 inventory file referenced by the manifest; s3://...
+    modified_days_ago : str
+        pandas Timedelta description, e.g. 2days
+    storage_options : dict, optional
+        Additional parameters passed to the s3fs.S3FileSystem to access the
+        S3 inventory file, eg. custom AWS profile options
+
+    Returns
+    -------
+    coverage : collections.Counter
+        Number of files per group, summed over the blocks of the file
+    df_last_n_days : list of pandas.DataFrame
+        Files modified within the look back period of each block
+    """
+    if not storage_options:
+        storage_options = {}
+    s3fs_s3 = s3fs.S3FileSystem(**storage_options)
+
+    df_last_n_days = []
+    coverage = Counter()
+    with s3fs_s3.open(inventory_url, "rb") as inventory_file:
+        # Parse the (gzip compressed) CSV in blocks with the multithreaded pyarrow
+        # CSV reader
+        inventory_stream = pa.input_stream(
+            inventory_file,
+            compression="gzip" if inventory_url.endswith(".gz") else None,
+        )
+        reader = pacsv.open_csv(
+            inventory_stream,
+            read_options=pacsv.ReadOptions(
+                column_names=["repo", "file", "size", "modified"],
+                block_size=INVENTORY_BLOCK_SIZE,
+            ),
+            convert_options=pacsv.ConvertOptions(
+                column_types={
+                    "file": pa.string(),
+                    "modified": pa.timestamp("ns", tz="UTC"),
+                },
+                include_columns=["file", "modified"],  # repo and size are not used
+            ),
+        )
+        for batch in reader:
+            # Only convert the HDF5 file records of the block to pandas
+            batch = batch.filter(pc.ends_with(batch.column("file"), ".h5"))
+            # Extract counts per group and groups within defined time window
+            df_co, df_last = _handle_inventory(batch.to_pandas(), modified_days_ago)
+            # Extract IDs latest N days modified files
+            df_last_n_days.append(df_last)
+            # Count occurrences per radar-day -> coverage input, summed while reading
+            coverage.update(df_co.to_dict())
+    return coverage, df_last_n_days
+
+
 def handle_manifest(manifest_url, modified_days_ago="2day", storage_options=None):
     """Extract modified days and coverage from a manifest file
 
@@ -335,50 +452,33 @@ def handle_manifest(manifest_url, modified_days_ago="2day", storage_options=None
     """
 
     # TODO - add additional checks on input
-    df_last_n_days = []
-    df_coverage = []
-    for j, obj in enumerate(list_manifest_file_keys(manifest_url, storage_options)):
-        # Read the manifest referenced file
-        parsed_url = urllib.parse.urlparse(manifest_url)
-
-        with pd.read_csv(
-            f"s3://{parsed_url.netloc}/{obj['key']}",
-            engine="c",
-            names=["repo", "file", "size", "modified"],
-            storage_options=storage_options,
-            chunksize=50000,
-        ) as reader:
-            for chunk in reader:
-                # Extract counts per group and groups within defined time window
-                df_co, df_last = _handle_inventory(
-                    chunk,
-                    modified_days_ago,
-                    group_func=extract_daily_group_from_inventory,
-                )
-                # Extract IDs latest N days modified files
-                df_last_n_days.append(df_last)
-                # Count occurrences per radar-day -> coverage input
-                df_coverage.append(df_co)
+    parsed_url = urllib.parse.urlparse(manifest_url)
+    inventory_urls = [
+        f"s3://{parsed_url.netloc}/{obj['key']}"
+        for obj in list_manifest_file_keys(manifest_url, storage_options)
+    ]
+    # Read the manifest referenced files concurrently
+    read_inventory = partial(
+        _handle_inventory_file,
+        modified_days_ago=modified_days_ago,
+        storage_options=storage_options,
+    )
+    with ThreadPoolExecutor(max_workers=INVENTORY_MAX_WORKERS) as executor:
+        inventories = list(executor.map(read_inventory, inventory_urls))
+    coverage = sum((file_coverage for file_coverage, _ in inventories), Counter())
+    df_last_n_days = [
+        df_last for _, last_n_days in inventories for df_last in last_n_days
+    ]
 
     # Create coverage file DataFrame
-    df_cov = pd.concat(df_coverage)
-    df_cov = df_cov.reset_index().groupby("index")[0].sum().reset_index()
-    df_cov = df_cov.rename(columns={"index": "directory", 0: "file_count"})
+    df_cov = pd.DataFrame(sorted(coverage.items()), columns=["directory", "file_count"])
 
     # Create modified days DataFrame
     df_mod = pd.concat(df_last_n_days)
     df_days_to_create_vpts = (
-        df_mod.set_index("file")
-        .groupby(extract_daily_group_from_inventory)
-        .size()
-        .reset_index()
-    )
-    df_days_to_create_vpts = df_days_to_create_vpts.rename(
-        columns={
-            "index": "directory",
-            "file": "directory",  # mapping depends on content; both included
-            0: "file_count",
-        }
+        _radar_day_counts_from_inventory(df_mod)
+        .rename_axis("directory")
+        .reset_index(name="file_count")
     )
 
     return df_cov, df_days_to_create_vpts
@@ -0,0 +1,20 @@
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Multipart settings of the boto3 up- and downloads: small HDF5 files are transferred
+# with a single request, larger (monthly) VPTS files in parts of 8MB with 8 concurrent
+# threads
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+)
+
+# Client settings shared by the CLI routines: a connection pool large enough for the
+# concurrent workers (each using multiple transfer threads), standard retry mode and TCP
+# keepalive
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"mode": "standard", "max_attempts": 10},
+    tcp_keepalive=True,
+)
@@ -42,29 +42,30 @@ def _odim_get_variables(dataset, variable_mapping: dict, quantity: str) -> List[
 
     Notes
     -----
-    In order to handle the 'nodata' and 'undetect', a list overcomes casting as is done
-    when using numpy in this case (and the non exsitence of Nan for integer in numpy).
+    In order to handle the 'nodata' and 'undetect', an object array overcomes casting
+    as is done when using numpy in this case (and the non exsitence of Nan for integer
+    in numpy). The comparison with 'nodata' and 'undetect' is vectorized on the numeric
+    values.
     """
-    data_group = variable_mapping[quantity]
+    data_group = dataset[variable_mapping[quantity]]
 
-    gain = dataset[data_group]["what"].attrs["gain"]
-    offset = dataset[data_group]["what"].attrs["offset"]
+    # read the attributes at once instead of a HDF5 lookup for each of them
+    attrs = dict(data_group["what"].attrs)
+    gain = attrs["gain"]
+    offset = attrs["offset"]
 
-    nodata_val = dataset[data_group]["what"].attrs["nodata"]
-    undetect_val = dataset[data_group]["what"].attrs["undetect"]
+    nodata_val = attrs["nodata"]
+    undetect_val = attrs["undetect"]
 
     # Apply offset/gain while preserving the original variable datatype
-    variable_dtype = dataset[data_group]["data"].dtype
-    values = (
-        (dataset[data_group]["data"] * gain + offset)
-        .astype(variable_dtype)
-        .flatten()
-        .tolist()
-    )
-    # use regular list here to have mixed dtypes for the data versus nodata/undetect
-    values = [NODATA if value == nodata_val else value for value in values]
-    values = [UNDETECT if value == undetect_val else value for value in values]
-    return values
+    data = data_group["data"]
+    values = (data[()] * gain + offset).astype(data.dtype).ravel()
+    # use object array here to have mixed dtypes for the data versus nodata/undetect,
+    # nodata is applied last to take precedence when nodata and undetect are equal
+    mixed_values = values.astype(object)
+    mixed_values[values == undetect_val] = UNDETECT
+    mixed_values[values == nodata_val] = NODATA
+    return mixed_values.tolist()
 
 
 @dataclass(frozen=True)
@@ -122,18 +123,28 @@ class BirdProfile:
         """
         df = pd.DataFrame(vpts_csv_version.mapping(self), dtype=str)
 
-        df = df.replace(
-            {UNDETECT: vpts_csv_version.undetect, NODATA: vpts_csv_version.nodata}
-        )
-
-        # sort the data according to sorting rule
-        df = (
-            df.astype(vpts_csv_version.sort)
-            .sort_values(by=list(vpts_csv_version.sort.keys()))
-            .astype(str)
+        # only replace when the ruleset representation differs from the internal one
+        replacements = {
+            key: value
+            for key, value in {
+                UNDETECT: vpts_csv_version.undetect,
+                NODATA: vpts_csv_version.nodata,
+            }.items()
+            if key != value
+        }
+        if replacements:
+            df = df.replace(replacements)
+
+        # sort the data according to sorting rule, only casting the sorting columns
+        sort_columns = list(vpts_csv_version.sort.keys())
+        order = (
+            df[sort_columns]
+            .astype(vpts_csv_version.sort)
+            .sort_values(by=sort_columns)
+            .index
         )
-
-        return df
+        # dtype=str on construction leaves float NaN and None values as is
+        return df.loc[order].astype(str)
 
     @classmethod
     def from_odim(cls, source_odim: ODIMReader, source_file=None):
@@ -144,11 +155,16 @@ class BirdProfile:
         source_odim : ODIMReader
             ODIM file reader interface.
         source_file : str, optional
-            URL or path to the source file from which the data were derived.
+            URL or path to the source file from which the data were derived. When
+            not provided, the file name of the ODIM file is used.
+
+        Raises
+        ------
+        ValueError : No source_file provided and the ODIM file name is unknown
         """
         dataset1 = source_odim.hdf5["dataset1"]
         variable_mapping = {
-            value[f"/dataset1/{key}"]["what"].attrs["quantity"].decode("utf8"): key
+            value["what"].attrs["quantity"].decode("utf8"): key
             for key, value in dataset1.items()
             if key != "what"
         }
@@ -161,9 +177,14 @@ class BirdProfile:
                 dataset1, variable_mapping, quantity=variable
             )
 
-        # Resolve hdf5 file full path if no source_file is provided by the user
+        # Use the hdf5 file name if no source_file is provided by the user
         if not source_file:
-            source_file = Path(source_odim.hdf5.filename).name
+            source_file = source_odim.file_name
+            if not source_file:
+                raise ValueError(
+                    "The file name of the ODIM file-like object is unknown, "
+                    "provide a source_file."
+                )
 
         return cls(
             datetime=source_odim.root_datetime,
@@ -182,15 +203,16 @@ def vp(file_path, vpts_csv_version="v1.0", source_file=""):
 
     Parameters
     ----------
-    file_path : Path
-        File Path of ODIM HDF5
+    file_path : Path | file-like object
+        File Path of ODIM HDF5 or a binary file-like object to read it from
     vpts_csv_version : str, default ""
         Ruleset with the VPTS CSV ruleset to use, e.g. v1.0
     source_file : str | callable
         URL or path to the source file from which the data were derived or
         a callable that converts the file_path to the source_file. See
         https://aloftdata.eu/vpts-csv/#source_file for more information on
-        the source file field.
+        the source file field. Required for file-like objects without a name,
+        e.g. ``io.BytesIO``.
 
 
     Examples
@@ -220,7 +242,7 @@ def _convert_to_source(file_path):
     return Path(file_path).name
 
 
-def vpts(file_paths, vpts_csv_version="v1.0", source_file=None):
+def vpts(file_paths, vpts_csv_version="v1.0", source_file=None, pool=None):
     """Convert set of HDF5 files to a DataFrame all as string
 
     Parameters
@@ -232,12 +254,19 @@ def vpts(file_paths, vpts_csv_version="v1.0", source_file=None):
     source_file : callable, optional
         A callable that converts the file_path to the source_file. When None,
         the file name itself (without parent folder reference) is used.
+    pool : multiprocessing.pool.Pool, optional
+        Process pool to convert the files with. When None, a pool with a process
+        for each CPU (but one) is created for the conversion.
 
     Notes
     -----
     Due tot the multiprocessing support, the source_file as a callable can not be
     a anonymous lambda function.
 
+    When converting multiple sets of files from threads, pass a single pool
+    created before the threads are started. Forking new pools from a process
+    running other threads can deadlock and oversubscribes the CPUs.
+
     Examples
     --------
     >>> file_paths = sorted(Path("../data/raw/baltrad/").rglob("*.h5"))
@@ -254,14 +283,15 @@ def vpts(file_paths, vpts_csv_version="v1.0", source_file=None):
     if not source_file:
         source_file = _convert_to_source
 
-    cpu_count = max(multiprocessing.cpu_count() - 1, 1)
-    with multiprocessing.Pool(processes=cpu_count) as pool:
-        data = pool.map(
-            functools.partial(
-                vp, vpts_csv_version=vpts_csv_version, source_file=source_file
-            ),
-            file_paths,
-        )
+    convert = functools.partial(
+        vp, vpts_csv_version=vpts_csv_version, source_file=source_file
+    )
+    if pool is not None:
+        data = pool.map(convert, file_paths)
+    else:
+        cpu_count = max(multiprocessing.cpu_count() - 1, 1)
+        with multiprocessing.Pool(processes=cpu_count) as pool:
+            data = pool.map(convert, file_paths)
 
     vpts_ = pd.concat(data)
 
@@ -282,9 +312,15 @@ def vpts_to_csv(df, file_path):
     ----------
     df : pandas.DataFrame
         DataFrame with VP or VPTS data
-    file_path : Path | str
-        File path to store the VPTS file
+    file_path : Path | str | file-like object
+        File path to store the VPTS file or a (binary) file-like object to write the VPTS data to,
+        e.g. to stream the data to S3 without intermediate file.
     """
+    # write directly to file-like objects
+    if hasattr(file_path, "write"):
+        df.to_csv(file_path, sep=CSV_FIELD_DELIMITER, encoding=CSV_ENCODING, index=False)
+        return
+
     # check for str input of Path
     if not isinstance(file_path, Path):
         file_path = Path(file_path)
@@ -1,5 +1,6 @@
 import re
 from abc import ABC, abstractmethod
+from functools import lru_cache
 
 import numpy as np
 
@@ -139,9 +140,13 @@ to the `_get_vpts_version` function
 """
 
 
+@lru_cache(maxsize=None)
 def get_vpts_version(version: str):
     """Link version ID (v1, v2,..) with correct AbstractVptsCsv child class
 
+    As the VPTS CSV version classes are stateless, a single instance is created
+    and reused for each version.
+
     Parameters
     ----------
     version : str
@@ -190,8 +195,8 @@ class AbstractVptsCsv(ABC):
             dict(radar=str, datetime=str, height=int, source_file=str)
 
         As the data is returned as strings, casting to the data
-        is done before sorting, after which the casting to str
-        is applied again.
+        type is done on these columns to define the row order,
+        after which all data is returned as str again.
         """
         return dict()
 
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from vptstools.odimh5 import ODIMReader, InvalidSourceODIM, check_vp_odim
@@ -15,6 +17,22 @@ def test_with_statement(file_path_pvol):
         assert hasattr(odim, "hdf5")
 
 
+def test_file_object(file_path_pvol):
+    """ODIMReader can read from a binary file-like object as well"""
+    with open(file_path_pvol, "rb") as hdf5_file:
+        file_object = io.BytesIO(hdf5_file.read())
+    with ODIMReader(file_object) as odim:
+        assert odim.root_date_str == "20170214"
+        assert odim.file_name is None  # no name available for in-memory data
+
+
+def test_root_attributes_cached(file_path_pvol):
+    """Root attributes are only read once from the HDF5 file"""
+    with ODIMReader(file_path_pvol) as odim:
+        assert odim.how is odim.how
+        assert odim.root_source is odim.root_source
+
+
 def test_root_date_str(file_path_pvol):
     """The root_date_str property can be used to get the root date"""
     with ODIMReader(file_path_pvol) as odim:
@@ -9,7 +9,9 @@ from vptstools.s3 import (
     OdimFilePath,
     handle_manifest,
     _handle_inventory,  # noqa
+    _daily_groups_from_inventory,
     extract_daily_group_from_inventory,
+    extract_daily_group_from_path,
     list_manifest_file_keys,
     _last_modified_from_inventory,
 )  # noqa
@@ -386,6 +388,31 @@ class TestOdimFilePath:
         as grouping level for coverage and daily VPTS"""
         assert extract_daily_group_from_inventory
 
+    def test_daily_groups_from_inventory(self):
+        """Groups extracted at once for all files match the groups of the individual files"""
+        file_paths = pd.Series(
+            [
+                "baltrad/hdf5/fivan/2016/10/25/fivan_vp_20161025T2100Z_0x7_147742969449.h5",
+                "baltrad/hdf5/fiuta/2021/11/14/fiuta_vp_20211114T214500Z_0xb.h5",
+                "ecog-04003/hdf5/PLPOZ/2016/09/23/PLPOZ_vp_20160923T0000Z.h5",
+            ]
+        )
+        df_groups = _daily_groups_from_inventory(file_paths)
+        assert list(df_groups.itertuples(index=False, name=None)) == [
+            extract_daily_group_from_inventory(file_path) for file_path in file_paths
+        ]
+
+    def test_extract_daily_group_from_path(self):
+        """s3fs enlisted paths start with the bucket name, followed by the inventory path"""
+        assert extract_daily_group_from_path(
+            "dummy-aloftdata/baltrad/hdf5/nosta/2023/03/11/nosta_vp_20230311T231500Z_0xb.h5"
+        ) == ("baltrad", "hdf5", "nosta", "2023", "03", "11")
+
+    def test_daily_groups_from_inventory_invalid(self):
+        """Invalid file names in the inventory raise an error"""
+        with pytest.raises(ValueError, match="not a valid ODIM HDF5 file"):
+            _daily_groups_from_inventory(pd.Series(["baltrad/hdf5/coverage.h5"]))
+
     def test_last_modified_from_manifest_subfile(self):
         """Manifest records are correctly filtered on modified date"""
         # create a dataframe with a record for each of the last 10 days
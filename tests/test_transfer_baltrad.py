@@ -0,0 +1,245 @@
+import io
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import paramiko
+import pytest
+from click.testing import CliRunner
+
+from vptstools.bin.transfer_baltrad import (
+    s3_key_exists,
+    list_existing_keys,
+    extract_metadata_from_filename,
+    destination_key_from_filename,
+    cli,
+)
+
+
+def test_s3_key_exists(s3_inventory):
+    """An existing key in the bucket is detected"""
+    assert s3_key_exists(
+        "baltrad/hdf5/nosta/2023/03/11/nosta_vp_20230311T231500Z_0xb.h5",
+        "dummy-aloftdata",
+        s3_inventory,
+    )
+
+
+def test_s3_key_not_exists(s3_inventory):
+    """A missing key or a prefix of an existing key is not considered existing"""
+    assert not s3_key_exists(
+        "baltrad/hdf5/nosta/2023/03/12/nosta_vp_20230312T001500Z_0xb.h5",
+        "dummy-aloftdata",
+        s3_inventory,
+    )
+    assert not s3_key_exists(
+        "baltrad/hdf5/nosta/2023/03/11/", "dummy-aloftdata", s3_inventory
+    )
+
+
+def test_list_existing_keys(s3_inventory):
+    """All keys within the prefix are listed"""
+    existing_keys = list_existing_keys(
+        "baltrad/hdf5/nosta/2023/03/11/", "dummy-aloftdata", s3_inventory
+    )
+    assert len(existing_keys) == 5
+    assert (
+        "baltrad/hdf5/nosta/2023/03/11/nosta_vp_20230311T231500Z_0xb.h5" in existing_keys
+    )
+    assert not list_existing_keys(
+        "baltrad/hdf5/nosta/2023/03/12/", "dummy-aloftdata", s3_inventory
+    )
+
+
+def test_destination_key_from_filename():
+    """S3 key is defined by the radar code and date of the file name"""
+    assert (
+        destination_key_from_filename("fropo_vp_20220809T051000Z_0xb.h5")
+        == "baltrad/hdf5/fropo/2022/08/09/fropo_vp_20220809T051000Z_0xb.h5"
+    )
+
+
+def test_extract_metadata_from_filename():
+    """Radar code and date are extracted from the file name"""
+    assert extract_metadata_from_filename("fropo_vp_20220809T051000Z_0xb.h5") == (
+        "fropo", "2022", "08", "09"
+    )
+
+
+def test_extract_metadata_from_filename_invalid():
+    """A file name not following the VP naming convention raises an error"""
+    with pytest.raises(ValueError, match="not a valid VP file name"):
+        extract_metadata_from_filename("fropo_vp_latest.h5")
+
+
+class MockSFTPFile(io.BytesIO):
+    """Minimal stand-in for a paramiko SFTP file"""
+
+    def prefetch(self, file_size=None):
+        pass
+
+
+class MockSFTPClient:
+    """Minimal stand-in for a paramiko SFTP channel serving the files of a local folder"""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def chdir(self, path):
+        pass
+
+    def listdir_iter(self):
+        return (
+            SimpleNamespace(filename=path.name, st_size=path.stat().st_size)
+            for path in sorted(self.folder.iterdir())
+        )
+
+    def open(self, filename, mode="r"):
+        return MockSFTPFile((self.folder / filename).read_bytes())
+
+    def close(self):
+        pass
+
+
+def test_e2e_cli(s3_inventory, path_inventory, tmp_path, monkeypatch):
+    """New VP files are transferred from the SFTP server to S3, existing files and PVOLs are ignored"""
+    sftp_folder = tmp_path / "data"
+    sftp_folder.mkdir()
+    for h5file in (path_inventory / "vp").glob("*.h5"):  # already on S3
+        shutil.copyfile(h5file, sftp_folder / h5file.name)
+    shutil.copyfile(  # new VP file
+        path_inventory / "vp" / "nosta_vp_20230311T231500Z_0xb.h5",
+        sftp_folder / "nosta_vp_20230312T001500Z_0xb.h5",
+    )
+    (sftp_folder / "nosta_pvol_20230312T001500Z_0xb.h5").write_bytes(b"")
+    (sftp_folder / "nosta_vp_latest.h5").write_bytes(b"")  # not following the VP naming convention
+
+    ssh = MagicMock()
+    ssh.return_value.__enter__.return_value.open_sftp.side_effect = (
+        lambda: MockSFTPClient(sftp_folder)
+    )
+    with patch("paramiko.SSHClient", ssh), patch(
+        "vptstools.bin.transfer_baltrad.DESTINATION_BUCKET", "dummy-aloftdata"
+    ), patch.dict(os.environ, {"FTP_PORT": "22"}):
+        os.environ.pop("PARAMIKO_DEBUG", None)
+        monkeypatch.chdir(tmp_path)
+        result = CliRunner().invoke(cli, ["--max-workers", "2"])
+
+    assert result.exception is None
+    assert result.output.count("already exists at dummy-aloftdata, skip it") == 5
+    assert "Transfer of file nosta_vp_20230312T001500Z_0xb.h5 to S3 completed!" in result.output
+    assert s3_key_exists(
+        "baltrad/hdf5/nosta/2023/03/12/nosta_vp_20230312T001500Z_0xb.h5",
+        "dummy-aloftdata",
+        s3_inventory,
+    )
+    assert "pvol" not in result.output
+    assert "nosta_vp_latest.h5 is not a valid VP file name, skip it." in result.output
+    assert not (tmp_path / "paramiko.log").exists()  # no debug log unless requested
+
+
+def _mock_ssh_client(sftp_folder, max_sessions=None):
+    """Mock paramiko.SSHClient refusing new SFTP channels beyond max_sessions, as sshd does"""
+    ssh = MagicMock()
+    sessions = []
+
+    def open_sftp():
+        if max_sessions is not None and len(sessions) >= max_sessions:
+            raise paramiko.ChannelException(1, "Administratively prohibited")
+        sessions.append(MockSFTPClient(sftp_folder))
+        return sessions[-1]
+
+    ssh.return_value.__enter__.return_value.open_sftp.side_effect = open_sftp
+    return ssh, sessions
+
+
+@pytest.fixture
+def sftp_folder_new_files(path_inventory, tmp_path):
+    """SFTP data folder with four VP files not yet on S3"""
+    sftp_folder = tmp_path / "data"
+    sftp_folder.mkdir()
+    for hour in range(4):
+        shutil.copyfile(
+            path_inventory / "vp" / "nosta_vp_20230311T231500Z_0xb.h5",
+            sftp_folder / f"nosta_vp_20230312T0{hour}1500Z_0xb.h5",
+        )
+    return sftp_folder
+
+
+def test_e2e_cli_max_channels(s3_inventory, sftp_folder_new_files):
+    """The number of SFTP channels is limited by max-channels, independent from the workers"""
+    ssh, sessions = _mock_ssh_client(sftp_folder_new_files)
+    with patch("paramiko.SSHClient", ssh), patch(
+        "vptstools.bin.transfer_baltrad.DESTINATION_BUCKET", "dummy-aloftdata"
+    ), patch.dict(os.environ, {"FTP_PORT": "22"}):
+        result = CliRunner().invoke(cli, ["--max-workers", "4", "--max-channels", "2"])
+
+    assert result.exception is None
+    assert len(sessions) == 3  # listing channel and two download channels
+    assert result.output.count("to S3 completed!") == 4
+
+
+def test_e2e_cli_default_workers(s3_inventory, sftp_folder_new_files):
+    """The number of workers defaults to the number of SFTP channels"""
+    ssh, sessions = _mock_ssh_client(sftp_folder_new_files)
+    with patch("paramiko.SSHClient", ssh), patch(
+        "vptstools.bin.transfer_baltrad.DESTINATION_BUCKET", "dummy-aloftdata"
+    ), patch.dict(os.environ, {"FTP_PORT": "22"}), patch(
+        "vptstools.bin.transfer_baltrad.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+    ) as executor:
+        result = CliRunner().invoke(cli, ["--max-channels", "2"])
+
+    assert result.exception is None
+    executor.assert_called_once_with(max_workers=2)
+    assert len(sessions) == 3  # listing channel and two download channels
+    assert result.output.count("to S3 completed!") == 4
+
+
+def test_e2e_cli_channel_refused(s3_inventory, sftp_folder_new_files):
+    """When the server refuses additional channels, the transfer continues with the open channels"""
+    ssh, sessions = _mock_ssh_client(sftp_folder_new_files, max_sessions=2)
+    with patch("paramiko.SSHClient", ssh), patch(
+        "vptstools.bin.transfer_baltrad.DESTINATION_BUCKET", "dummy-aloftdata"
+    ), patch.dict(os.environ, {"FTP_PORT": "22"}):
+        result = CliRunner().invoke(cli, ["--max-workers", "4"])
+
+    assert result.exception is None
+    assert len(sessions) == 2
+    assert "Could not open an additional SFTP channel" in result.output
+    assert result.output.count("to S3 completed!") == 4
+
+
+@pytest.fixture
+def paramiko_logger():
+    """Restore the paramiko logger after the test, as debug logging adds a file handler"""
+    logger = logging.getLogger("paramiko")
+    handlers, level = list(logger.handlers), logger.level
+    yield logger
+    for handler in logger.handlers:
+        if handler not in handlers:
+            handler.close()
+            logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def test_e2e_cli_paramiko_debug(s3_inventory, sftp_folder_new_files, tmp_path, monkeypatch,
+                                paramiko_logger):
+    """The paramiko debug log is written to file when PARAMIKO_DEBUG is set"""
+    ssh, _ = _mock_ssh_client(sftp_folder_new_files)
+    with patch("paramiko.SSHClient", ssh), patch(
+        "vptstools.bin.transfer_baltrad.DESTINATION_BUCKET", "dummy-aloftdata"
+    ), patch.dict(os.environ, {"FTP_PORT": "22", "PARAMIKO_DEBUG": "1"}):
+        monkeypatch.chdir(tmp_path)
+        result = CliRunner().invoke(cli, ["--max-workers", "2"])
+
+    assert result.exception is None
+    assert (tmp_path / "paramiko.log").exists()
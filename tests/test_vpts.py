@@ -1,5 +1,7 @@
 import datetime
 import dataclasses
+import io
+import multiprocessing
 from pathlib import Path
 
 import pytest
@@ -184,6 +186,24 @@ class TestVpts:
         df = vp_metadata_only.to_vp(vpts_csv_version)
         assert df["vcp"].unique() == np.array(["12"])
 
+    def test_vp_nan_value(self, vpts_version, path_with_vp):
+        """A NaN variable value is written as 'nan', different from nodata and undetect"""
+        vpts_csv_version = get_vpts_version(vpts_version)
+        file_path = sorted(path_with_vp.rglob("*.h5"))[0]
+        with ODIMReader(file_path) as odim_vp:
+            bird_profile = BirdProfile.from_odim(odim_vp)
+        bird_profile.variables["u"][0] = np.nan  # first height level
+        df = bird_profile.to_vp(vpts_csv_version)
+        assert (df.dtypes == object).all()
+        assert df["u"].map(type).eq(str).all()
+
+        file_object = io.BytesIO()
+        vpts_to_csv(df, file_object)
+        header, first_row = file_object.getvalue().decode("utf8").splitlines()[:2]
+        u_value = first_row.split(",")[header.split(",").index("u")]
+        assert u_value == "nan"
+        assert u_value not in (vpts_csv_version.nodata, vpts_csv_version.undetect)
+
     def test_vp_no_source_file(self, vpts_version, path_with_vp):
         """The file name itself is used when no source_file reference is provided"""
         file_path = sorted(path_with_vp.rglob("*.h5"))[0]
@@ -194,6 +214,19 @@ class TestVpts:
             == "bejab_vp_20221111T233000Z_0x9.h5"
         )
 
+    def test_vp_file_object(self, vpts_version, path_with_vp):
+        """A file-like object is converted with its file name as source_file if known"""
+        file_path = sorted(path_with_vp.rglob("*.h5"))[0]
+        with open(file_path, "rb") as hdf5_file:
+            df_vp = vp(hdf5_file, vpts_version)
+        pd.testing.assert_frame_equal(df_vp, vp(file_path, vpts_version))
+
+        file_object = io.BytesIO(file_path.read_bytes())
+        with pytest.raises(ValueError, match="provide a source_file"):
+            vp(file_object, vpts_version)
+        df_vp = vp(file_object, vpts_version, source_file=file_path.name)
+        pd.testing.assert_frame_equal(df_vp, vp(file_path, vpts_version))
+
     def test_vp_custom_callable_file(self, vpts_version, path_with_vp):
         """The source file reference can be overwritten by a custom callable using the
         file_path as input"""
@@ -235,6 +268,15 @@ class TestVpts:
         df_vpts = vpts(file_paths, vpts_version, _convert_to_source_s3)
         assert df_vpts["source_file"].str.startswith("s3://dummy-aloftdata/baltrad").all()
 
+    def test_vpts_shared_pool(self, vpts_version, path_with_vp):
+        """A user provided process pool gives the same result and stays open"""
+        file_paths = sorted(path_with_vp.rglob("*.h5"))
+        with multiprocessing.Pool(processes=2) as pool:
+            df_vpts = vpts(file_paths, vpts_version, pool=pool)
+            df_vpts_reuse = vpts(file_paths, vpts_version, pool=pool)
+        pd.testing.assert_frame_equal(df_vpts, vpts(file_paths, vpts_version))
+        pd.testing.assert_frame_equal(df_vpts_reuse, df_vpts)
+
     def test_vp_invalid_file(self, vpts_version, path_with_wrong_h5):  # noqa
         """Invalid HDF5 VP file raises InvalidSourceODIM exceptin"""
         with pytest.raises(InvalidSourceODIM):
@@ -282,6 +324,15 @@ class TestVptsToCsv:
         vpts_to_csv(df_vpts, str(custom_folder / "vpts.csv"))
         assert custom_folder.exists()
 
+    def test_file_object(self, vpts_version, path_with_vp, tmp_path):
+        """To CSV support a binary file-like object instead of a file path as well"""
+        file_paths = sorted(path_with_vp.rglob("*.h5"))
+        df_vpts = vpts(file_paths, vpts_version)
+        vpts_to_csv(df_vpts, tmp_path / "vpts.csv")
+        file_object = io.BytesIO()
+        vpts_to_csv(df_vpts, file_object)
+        assert file_object.getvalue() == (tmp_path / "vpts.csv").read_bytes()
+
 
 class TestBirdProfile:
     def test_from_odim(self, path_with_vp):
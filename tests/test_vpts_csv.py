@@ -64,6 +64,10 @@ class TestVptsVersionMapper:
         """User defined version is mapped to correct class"""
         assert isinstance(get_vpts_version("v1.0"), VptsCsvV1)
 
+    def test_version_mapper_cached(self):
+        """The same instance is returned for each call with the same version"""
+        assert get_vpts_version("v1.0") is get_vpts_version("v1.0")
+
     def test_version_non_existent(self):
         """Raise error when none-supported version is requested"""
         with pytest.raises(VptsCsvVersionError):